@@ -8,9 +8,14 @@ Ported to Python 2024
 
 import numpy as np
 import argparse
+import ctypes
+import io
+import os
+import subprocess
 import sys
+import tempfile
+from functools import lru_cache, partial
 from typing import List, Tuple, Optional
-from dataclasses import dataclass
 
 # Constants
 PI = np.pi
@@ -18,17 +23,6 @@ TWOPI = 2.0 * PI
 EPS = 1e-10
 MAXORDER = 10
 
-@dataclass
-class PoleZeroRep:
-    """Representation of poles and zeros in S or Z plane"""
-    poles: np.ndarray
-    zeros: np.ndarray
-
-    def __init__(self):
-        self.poles = np.array([], dtype=complex)
-        self.zeros = np.array([], dtype=complex)
-
-
 # Bessel poles table (only one member of each complex conjugate pair)
 BESSEL_POLES = np.array([
     [-1.00000000000e+00+0.00000000000e+00j], [-1.10160133059e+00+6.36009824757e-01j],
@@ -49,12 +43,75 @@ BESSEL_POLES = np.array([
 ])
 
 
+def _build_bessel(order: int) -> np.ndarray:
+    """Expand the tabulated Bessel poles for one order into the full LHP set"""
+    p = (order * order) // 4
+    parts = []
+    if order & 1:  # odd order: one real pole first
+        parts.append(BESSEL_POLES[p:p + 1, 0])
+        p += 1
+    seg = BESSEL_POLES[p:p + order // 2, 0]
+    # Each tabulated pole followed by its conjugate
+    parts.append(np.column_stack([seg, np.conj(seg)]).ravel())
+    return np.concatenate(parts)
+
+# Full Bessel pole set per order, built once at import (index 0 unused)
+BESSEL_BY_ORDER = (None,) + tuple(_build_bessel(n) for n in range(1, MAXORDER + 1))
+
+
+@lru_cache(maxsize=None)
+def _butter_lhp_poles(order: int) -> np.ndarray:
+    """Left half-plane Butterworth poles, theta_k = pi/2 + (2k+1)*pi/(2N) (read-only)"""
+    k = np.arange(order)
+    theta = PI * (2 * k + order + 1) / (2 * order)
+    poles = np.exp(1j * theta)
+    poles.flags.writeable = False
+    return poles
+
+
+def _interleave(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """[a0, b0, a1, b1, ...] along the last axis"""
+    a, b = np.broadcast_arrays(a, b)
+    return np.stack([a, b], axis=-1).reshape(a.shape[:-1] + (-1,))
+
+
+def _pair_roots(roots: np.ndarray) -> List[Tuple[np.ndarray, complex]]:
+    """
+    Group roots into real first/second-order factors in z^-1 form
+
+    Each conjugate pair becomes [1, -2Re(p), |p|^2]; real roots are paired in
+    sorted order, a leftover one giving [1, -r, 0].
+
+    Returns:
+        List of (factor coefficients, representative root)
+    """
+    factors = []
+    for p in roots[roots.imag > EPS]:
+        factors.append((np.array([1.0, -2.0 * p.real, p.real * p.real + p.imag * p.imag]), p))
+    real = np.sort(roots[np.abs(roots.imag) <= EPS].real)
+    for i in range(0, len(real) - 1, 2):
+        r1, r2 = real[i], real[i + 1]
+        factors.append((np.array([1.0, -(r1 + r2), r1 * r2]), complex(r2)))
+    if len(real) & 1:
+        factors.append((np.array([1.0, -real[-1], 0.0]), complex(real[-1])))
+    return factors
+
+
 class MkFilter:
     """Digital filter design class"""
 
+    __slots__ = ('s_poles', 's_zeros', 'z_poles', 'z_zeros', 'order',
+                 'raw_alpha1', 'raw_alpha2', 'warped_alpha1', 'warped_alpha2',
+                 'chebrip', 'filter_type', 'band_type', 'use_blt', 'prewarp',
+                 'xcoeffs', 'ycoeffs', 'dc_gain', 'fc_gain', 'hf_gain',
+                 'original_freq', 'sample_rate', '_native')
+
     def __init__(self):
-        self.splane = PoleZeroRep()
-        self.zplane = PoleZeroRep()
+        # Poles and zeros in the S and Z planes
+        self.s_poles = np.array([], dtype=complex)
+        self.s_zeros = np.array([], dtype=complex)
+        self.z_poles = np.array([], dtype=complex)
+        self.z_zeros = np.array([], dtype=complex)
         self.order = 0
         self.raw_alpha1 = 0.0
         self.raw_alpha2 = 0.0
@@ -70,6 +127,9 @@ class MkFilter:
         self.dc_gain = 0.0
         self.fc_gain = 0.0
         self.hf_gain = 0.0
+        self.original_freq = None  # Hz, set by the CLI when -f is used
+        self.sample_rate = None
+        self._native = None      # ctypes handle from compile_native()
 
     def design(self, filter_type: str, band_type: str, order: int,
                alpha1: float, alpha2: Optional[float] = None,
@@ -91,6 +151,22 @@ class MkFilter:
         Returns:
             Tuple of (xcoeffs, ycoeffs) for the recurrence relation
         """
+        # Repeated parameter sets are served from the module-level cache;
+        # copies keep the cached arrays safe from callers mutating them.
+        # Scalars are normalized so NumPy inputs hash (and share entries).
+        state = _design_cached(filter_type, band_type, int(order), float(alpha1),
+                               None if alpha2 is None else float(alpha2),
+                               float(chebrip), bool(use_blt), bool(prewarp))
+        for name, value in zip(_DESIGN_STATE, state):
+            setattr(self, name, value.copy() if isinstance(value, np.ndarray) else value)
+        self._native = None
+
+        return self.xcoeffs, self.ycoeffs
+
+    def _design_uncached(self, filter_type: str, band_type: str, order: int,
+                         alpha1: float, alpha2: Optional[float],
+                         chebrip: float, use_blt: bool, prewarp: bool):
+        """Run the full design pipeline on this instance (see design())"""
         self.filter_type = filter_type
         self.band_type = band_type
         self.order = order
@@ -118,36 +194,17 @@ class MkFilter:
         # Expand polynomials to get coefficients
         self._expand_poly()
 
-        return self.xcoeffs, self.ycoeffs
-
     def _compute_s_plane(self):
         """Compute S-plane poles for prototype LP filter"""
-        poles = []
+        self.s_poles = np.array([], dtype=complex)
 
         if self.filter_type == 'Be':
             # Bessel filter
-            p = (self.order * self.order) // 4
-            if self.order & 1:  # odd order
-                poles.append(BESSEL_POLES[p][0])
-                p += 1
-            for i in range(self.order // 2):
-                pole = BESSEL_POLES[p][0]
-                poles.append(pole)
-                poles.append(np.conj(pole))
-                p += 1
+            self.s_poles = BESSEL_BY_ORDER[self.order].copy()
 
         if self.filter_type in ['Bu', 'Ch']:
             # Butterworth filter (also used as base for Chebyshev)
-            for i in range(2 * self.order):
-                if self.order & 1:
-                    theta = (i * PI) / self.order
-                else:
-                    theta = ((i + 0.5) * PI) / self.order
-                pole = np.exp(1j * theta)
-                if pole.real < 0.0:  # Only keep left half-plane poles
-                    poles.append(pole)
-
-        self.splane.poles = np.array(poles)
+            self.s_poles = _butter_lhp_poles(self.order).copy()
 
         if self.filter_type == 'Ch':
             # Modify for Chebyshev
@@ -162,8 +219,8 @@ class MkFilter:
                 raise ValueError(f"Chebyshev y={y}; must be > 0.0")
 
             # Scale poles
-            self.splane.poles = self.splane.poles.real * np.sinh(y) + \
-                               1j * self.splane.poles.imag * np.cosh(y)
+            self.s_poles = self.s_poles.real * np.sinh(y) + \
+                               1j * self.s_poles.imag * np.cosh(y)
 
     def _prewarp_frequencies(self):
         """Pre-warp frequencies for bilinear transform"""
@@ -176,75 +233,66 @@ class MkFilter:
 
     def _normalize(self):
         """Transform prototype to desired filter type (LP/HP/BP/BS)"""
+        # Works along the last axis, so w1/w2 of shape (m, 1) transform a
+        # whole batch of designs at once (see design_batch)
         w1 = TWOPI * self.warped_alpha1
         w2 = TWOPI * self.warped_alpha2
 
         if self.band_type == 'Lp':
             # Lowpass: scale poles by w1
-            self.splane.poles = self.splane.poles * w1
-            self.splane.zeros = np.array([], dtype=complex)
+            self.s_poles = self.s_poles * w1
+            self.s_zeros = np.zeros(self.s_poles.shape[:-1] + (0,), dtype=complex)
 
         elif self.band_type == 'Hp':
             # Highpass: invert poles and add zeros at origin
-            self.splane.poles = w1 / self.splane.poles
-            self.splane.zeros = np.zeros(len(self.splane.poles), dtype=complex)
+            self.s_poles = w1 / self.s_poles
+            self.s_zeros = np.zeros(self.s_poles.shape, dtype=complex)
 
         elif self.band_type == 'Bp':
             # Bandpass: LP to BP transformation
             w0 = np.sqrt(w1 * w2)
             bw = w2 - w1
-            new_poles = []
-            for pole in self.splane.poles:
-                hba = 0.5 * pole * bw
-                temp = np.sqrt(1.0 - (w0 / hba)**2)
-                new_poles.append(hba * (1.0 + temp))
-                new_poles.append(hba * (1.0 - temp))
-            self.splane.poles = np.array(new_poles)
-            self.splane.zeros = np.zeros(len(self.splane.poles) // 2, dtype=complex)
+            hba = 0.5 * self.s_poles * bw
+            temp = np.sqrt(1.0 - (w0 / hba)**2)
+            # Interleave so each prototype pole stays next to its partner
+            self.s_poles = _interleave(hba * (1.0 + temp), hba * (1.0 - temp))
+            self.s_zeros = np.zeros(hba.shape, dtype=complex)
 
         elif self.band_type == 'Bs':
             # Bandstop: LP to BS transformation
             w0 = np.sqrt(w1 * w2)
             bw = w2 - w1
-            new_poles = []
-            new_zeros = []
-            for pole in self.splane.poles:
-                hba = 0.5 * bw / pole
-                temp = np.sqrt(1.0 - (w0 / hba)**2)
-                new_poles.append(hba * (1.0 + temp))
-                new_poles.append(hba * (1.0 - temp))
-                new_zeros.append(1j * w0)
-                new_zeros.append(-1j * w0)
-            self.splane.poles = np.array(new_poles)
-            self.splane.zeros = np.array(new_zeros)
+            hba = 0.5 * bw / self.s_poles
+            temp = np.sqrt(1.0 - (w0 / hba)**2)
+            self.s_poles = _interleave(hba * (1.0 + temp), hba * (1.0 - temp))
+            self.s_zeros = _interleave(*np.broadcast_arrays(1j * w0, -1j * w0, hba)[:2])
 
     def _compute_z_blt(self):
         """Transform from S-plane to Z-plane using bilinear transform"""
-        # BLT: z = (2 + s) / (2 - s)
-        self.zplane.poles = (2.0 + self.splane.poles) / (2.0 - self.splane.poles)
-        if len(self.splane.zeros) > 0:
-            self.zplane.zeros = (2.0 + self.splane.zeros) / (2.0 - self.splane.zeros)
-        else:
-            self.zplane.zeros = np.array([], dtype=complex)
-
-        # Add zeros at -1 to make filter causal
-        while len(self.zplane.zeros) < len(self.zplane.poles):
-            self.zplane.zeros = np.append(self.zplane.zeros, -1.0)
+        # BLT: z = (2 + s) / (2 - s), computed in place in the output arrays
+        self.z_poles = np.empty(self.s_poles.shape, dtype=complex)
+        np.add(2.0, self.s_poles, out=self.z_poles)
+        np.divide(self.z_poles, 2.0 - self.s_poles, out=self.z_poles)
+
+        # Zeros beyond the transformed ones sit at -1 to make filter causal
+        nz = self.s_zeros.shape[-1]
+        shape = self.z_poles.shape[:-1] + (max(nz, self.z_poles.shape[-1]),)
+        self.z_zeros = np.full(shape, -1.0, dtype=complex)
+        head = self.z_zeros[..., :nz]
+        np.add(2.0, self.s_zeros, out=head)
+        np.divide(head, 2.0 - self.s_zeros, out=head)
 
     def _compute_z_mzt(self):
         """Transform from S-plane to Z-plane using matched z-transform"""
         # MZT: z = exp(s)
-        self.zplane.poles = np.exp(self.splane.poles)
-        if len(self.splane.zeros) > 0:
-            self.zplane.zeros = np.exp(self.splane.zeros)
-        else:
-            self.zplane.zeros = np.array([], dtype=complex)
+        self.z_poles = np.exp(self.s_poles.astype(complex, copy=False))
+        self.z_zeros = np.exp(self.s_zeros.astype(complex, copy=False))
 
     def _expand_poly(self):
         """Expand polynomials to get recurrence relation coefficients"""
         # Expand (z - z1)(z - z2)... to get polynomial coefficients
-        topcoeffs = self._expand(self.zplane.zeros)
-        botcoeffs = self._expand(self.zplane.poles)
+        topcoeffs = self._expand(self.z_zeros)
+        botcoeffs = self._expand(self.z_poles)
 
         # Compute gains at DC, center frequency, and high frequency
         self.dc_gain = self._evaluate(topcoeffs, botcoeffs, 1.0)
@@ -255,8 +303,8 @@ class MkFilter:
         # Extract real coefficients for recurrence relation
         # x[n] = sum(xcoeffs[i] * input[n-i])
         # y[n] = sum(xcoeffs[i] * x[n-i]) - sum(ycoeffs[i] * y[n-i])
-        nzeros = len(self.zplane.zeros)
-        npoles = len(self.zplane.poles)
+        nzeros = len(self.z_zeros)
+        npoles = len(self.z_poles)
 
         self.xcoeffs = np.real(topcoeffs) / np.real(botcoeffs[-1])
         self.ycoeffs = -np.real(botcoeffs) / np.real(botcoeffs[-1])
@@ -266,25 +314,28 @@ class MkFilter:
         if len(roots) == 0:
             return np.array([1.0], dtype=complex)
 
-        # Start with coefficient for z^0
-        coeffs = np.array([1.0], dtype=complex)
-
-        # Multiply by (z - root) for each root
-        for root in roots:
-            new_coeffs = np.zeros(len(coeffs) + 1, dtype=complex)
-            new_coeffs[0] = -root * coeffs[0]
-            for i in range(1, len(coeffs)):
-                new_coeffs[i] = coeffs[i-1] - root * coeffs[i]
-            new_coeffs[-1] = coeffs[-1]
-            coeffs = new_coeffs
-
-        return coeffs
+        # Product of (z - root) terms, ascending powers: coeffs[i] multiplies z^i.
+        # Complex roots come in conjugate pairs, so multiply real quadratic
+        # factors (z - p)(z - p*) = z^2 - 2Re(p)z + |p|^2 instead.
+        upper = roots[roots.imag > EPS]
+        lower = roots[roots.imag < -EPS]
+        if len(upper) != len(lower) or not np.allclose(
+                np.sort_complex(upper), np.sort_complex(np.conj(lower)), rtol=1e-9, atol=EPS):
+            return np.polynomial.polynomial.polyfromroots(roots).astype(complex)
+
+        coeffs = np.array([1.0])
+        for p in upper:
+            coeffs = np.convolve(coeffs, [p.real * p.real + p.imag * p.imag, -2.0 * p.real, 1.0])
+        for r in roots[np.abs(roots.imag) <= EPS].real:
+            coeffs = np.convolve(coeffs, [-r, 1.0])
+        return coeffs.astype(complex)
 
     def _evaluate(self, topcoeffs: np.ndarray, botcoeffs: np.ndarray,
                   z: complex) -> complex:
         """Evaluate transfer function at given z"""
-        top = sum(c * z**i for i, c in enumerate(topcoeffs))
-        bot = sum(c * z**i for i, c in enumerate(botcoeffs))
+        # Horner's method over ascending-power coefficients
+        top = np.polynomial.polynomial.polyval(z, topcoeffs)
+        bot = np.polynomial.polynomial.polyval(z, botcoeffs)
         return top / bot
 
     def get_gain(self) -> float:
@@ -299,66 +350,370 @@ class MkFilter:
             return abs(np.sqrt(self.dc_gain * self.hf_gain))
         return 1.0
 
+    def compile_native(self, cc: str = "cc") -> ctypes.CDLL:
+        """
+        Compile the generated C code into a shared library and load it
+
+        The library exports filter_step(float), filter_reset() and
+        filter_batch(const float *in, float *out, size_t n). The handle is
+        kept on the instance and used by apply() until the next design().
+
+        Args:
+            cc: C compiler to invoke
+
+        Returns:
+            The loaded ctypes library
+        """
+        code = ["#include <stddef.h>", generate_c_code(self, optimize=True)]
+        code.append("float filter_step(float input) { return filterStep(input); }\n")
+        code.append("void filter_reset(void)")
+        code.append("{")
+        code.append("  size_t i;")
+        code.append("  for (i = 0; i <= XMASK; i++) xv[i] = 0.0f;")
+        code.append("  for (i = 0; i <= YMASK; i++) yv[i] = 0.0f;")
+        code.append("  xpos = ypos = 0;")
+        code.append("}\n")
+        code.append("void filter_batch(const float *in, float *out, size_t n)")
+        code.append("{")
+        code.append("  size_t i;")
+        code.append("  for (i = 0; i < n; i++) out[i] = filterStep(in[i]);")
+        code.append("}")
+
+        with tempfile.TemporaryDirectory(prefix="mkfilter_") as tmpdir:
+            cpath = os.path.join(tmpdir, "filter.c")
+            sopath = os.path.join(tmpdir, "filter.so")
+            with open(cpath, "w") as f:
+                f.write("\n".join(code) + "\n")
+            try:
+                result = subprocess.run(
+                    [cc, "-O3", "-march=native", "-ffast-math", "-shared", "-fPIC",
+                     "-o", sopath, cpath],
+                    capture_output=True, text=True)
+            except OSError as e:
+                raise RuntimeError(f"Could not run C compiler '{cc}': {e}")
+            if result.returncode != 0:
+                raise RuntimeError(f"C compilation failed:\n{result.stderr}")
+            lib = ctypes.CDLL(sopath)
+
+        c_float_p = ctypes.POINTER(ctypes.c_float)
+        lib.filter_step.argtypes = [ctypes.c_float]
+        lib.filter_step.restype = ctypes.c_float
+        lib.filter_reset.argtypes = []
+        lib.filter_reset.restype = None
+        lib.filter_batch.argtypes = [c_float_p, c_float_p, ctypes.c_size_t]
+        lib.filter_batch.restype = None
+        self._native = lib
+        return lib
+
+    def apply(self, signal: np.ndarray) -> np.ndarray:
+        """
+        Filter a signal from zero initial state
+
+        Uses the native library from compile_native() when available
+        (float32 output), otherwise scipy.signal.lfilter, otherwise
+        iir_apply (both float64 output). Multi-dimensional input is
+        treated as independent signals along the last axis on every path.
+
+        Args:
+            signal: Input samples
+
+        Returns:
+            Filtered signal, same shape as the input
+        """
+        signal = np.asarray(signal)
+        if self._native is not None:
+            step = self._apply_native
+        else:
+            # Imported here so CLI paths that never filter skip loading SciPy
+            try:
+                from scipy.signal import lfilter
+            except ImportError:
+                step = partial(iir_apply, self.xcoeffs, self.ycoeffs, gain=self.get_gain())
+            else:
+                # Recurrence in z^-1 form: b[k] multiplies x[n-k], a[k] y[n-k]
+                b = self.xcoeffs[::-1] / self.get_gain()
+                a = -self.ycoeffs[::-1]
+                return lfilter(b, a, signal.astype(np.float64, copy=False), axis=-1)
+
+        if signal.ndim > 1:
+            return np.apply_along_axis(step, -1, signal)
+        return step(signal)
+
+    def _apply_native(self, signal: np.ndarray) -> np.ndarray:
+        """Run one 1-D signal through the compiled filter_batch"""
+        x = np.ascontiguousarray(signal, dtype=np.float32)
+        out = np.empty_like(x)
+        c_float_p = ctypes.POINTER(ctypes.c_float)
+        self._native.filter_reset()
+        self._native.filter_batch(x.ctypes.data_as(c_float_p), out.ctypes.data_as(c_float_p), x.size)
+        return out
+
+    def to_sos(self) -> np.ndarray:
+        """
+        Factor the filter into a cascade of second-order sections
+
+        Conjugate pole pairs become biquads, each matched with the nearest
+        remaining zero pair; sections are ordered with the poles closest to
+        the unit circle last. Missing zeros (matched z-transform) sit at
+        the origin. The 1/gain factor is folded into the first section.
+
+        Returns:
+            Array of shape (n_sections, 6), rows [b0, b1, b2, a0, a1, a2]
+            in the scipy.signal.sosfilt convention
+        """
+        # Pad the shorter root set with roots at the origin (z^-1 factor of 1)
+        n = max(len(self.z_poles), len(self.z_zeros))
+        poles = np.concatenate([self.z_poles, np.zeros(n - len(self.z_poles), dtype=complex)])
+        zeros = np.concatenate([self.z_zeros, np.zeros(n - len(self.z_zeros), dtype=complex)])
+
+        pole_factors = sorted(_pair_roots(poles), key=lambda f: abs(f[1]))
+        zero_factors = _pair_roots(zeros)
+
+        sos = np.zeros((len(pole_factors), 6))
+        # Match from the most critical (outermost) poles inwards
+        for i in range(len(pole_factors) - 1, -1, -1):
+            a, p = pole_factors[i]
+            j = min(range(len(zero_factors)), key=lambda k: abs(zero_factors[k][1] - p))
+            b, _ = zero_factors.pop(j)
+            sos[i, :3] = b
+            sos[i, 3:] = a
+        sos[0, :3] /= self.get_gain()
+        return sos
+
     def print_summary(self):
         """Print filter summary (like mkfilter -l output)"""
-        print(f"raw alpha1    = {self.raw_alpha1:14.10f}")
-        print(f"raw alpha2    = {self.raw_alpha2:14.10f}")
-        print(f"warped alpha1 = {self.warped_alpha1:14.10f}")
-        print(f"warped alpha2 = {self.warped_alpha2:14.10f}")
-
-        print(f"\ngain at dc:     mag = {abs(self.dc_gain):15.9e}", end="")
-        if abs(self.dc_gain) > EPS:
-            print(f"   phase = {np.angle(self.dc_gain)/PI:14.10f} pi")
-        else:
-            print()
+        # Build the whole report and write it once
+        parts = [
+            f"raw alpha1    = {self.raw_alpha1:14.10f}",
+            f"raw alpha2    = {self.raw_alpha2:14.10f}",
+            f"warped alpha1 = {self.warped_alpha1:14.10f}",
+            f"warped alpha2 = {self.warped_alpha2:14.10f}",
+            "",
+        ]
+
+        for label, g in (("gain at dc:    ", self.dc_gain),
+                         ("gain at centre:", self.fc_gain),
+                         ("gain at hf:    ", self.hf_gain)):
+            line = f"{label} mag = {abs(g):15.9e}"
+            if abs(g) > EPS:
+                line += f"   phase = {np.angle(g)/PI:14.10f} pi"
+            parts.append(line)
+
+        for title, roots in (("S-plane zeros:", self.s_zeros),
+                             ("S-plane poles:", self.s_poles),
+                             ("Z-plane zeros:", self.z_zeros),
+                             ("Z-plane poles:", self.z_poles)):
+            parts.append("")
+            parts.append(title)
+            parts.extend(f"\t{r.real:14.10f} + j {r.imag:14.10f}" for r in roots)
+
+        parts.append("")
+        parts.append("Recurrence relation:")
+        nx = len(self.xcoeffs) - 1
+        for i, c in enumerate(self.xcoeffs):
+            prefix = "y[n] = " if i == 0 else "     + "
+            parts.append(f"{prefix}({c:14.10f} * x[n-{nx-i:2d}])")
+        parts.append("")
+        ny = len(self.ycoeffs) - 1
+        for i, c in enumerate(self.ycoeffs[:-1]):  # Don't print last (always -1)
+            parts.append(f"     + ({c:14.10f} * y[n-{ny-i:2d}])")
+        parts.append("")
+
+        sys.stdout.write("\n".join(parts) + "\n")
+
+
+# Attributes filled in by a design, in the order _design_cached returns them
+_DESIGN_STATE = ('filter_type', 'band_type', 'order', 'raw_alpha1', 'raw_alpha2',
+                 'chebrip', 'use_blt', 'prewarp', 'warped_alpha1', 'warped_alpha2',
+                 's_poles', 's_zeros', 'z_poles', 'z_zeros',
+                 'xcoeffs', 'ycoeffs', 'dc_gain', 'fc_gain', 'hf_gain')
 
-        print(f"gain at centre: mag = {abs(self.fc_gain):15.9e}", end="")
-        if abs(self.fc_gain) > EPS:
-            print(f"   phase = {np.angle(self.fc_gain)/PI:14.10f} pi")
-        else:
-            print()
 
-        print(f"gain at hf:     mag = {abs(self.hf_gain):15.9e}", end="")
-        if abs(self.hf_gain) > EPS:
-            print(f"   phase = {np.angle(self.hf_gain)/PI:14.10f} pi")
+@lru_cache(maxsize=128)
+def _design_cached(filter_type: str, band_type: str, order: int,
+                   alpha1: float, alpha2: Optional[float], chebrip: float,
+                   use_blt: bool, prewarp: bool) -> tuple:
+    """Memoized design; returns the _DESIGN_STATE values with read-only arrays"""
+    mkf = MkFilter()
+    mkf._design_uncached(filter_type, band_type, order, alpha1, alpha2,
+                         chebrip, use_blt, prewarp)
+    state = tuple(getattr(mkf, name) for name in _DESIGN_STATE)
+    for value in state:
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+    return state
+
+
+def design_batch(filter_type: str, band_type: str, orders, alphas,
+                 chebrip: float = -1.0, use_blt: bool = True,
+                 prewarp: bool = True) -> List[MkFilter]:
+    """
+    Design a family of filters, vectorized across designs of equal order
+
+    Designs sharing an order run through the S-plane, band transform and
+    Z-plane stages as one (n_designs, n_roots) array; gains are evaluated
+    for the whole group at once.
+
+    Args:
+        filter_type: 'Bu' (Butterworth), 'Be' (Bessel), 'Ch' (Chebyshev)
+        band_type: 'Lp' (lowpass), 'Hp' (highpass), 'Bp' (bandpass), 'Bs' (bandstop)
+        orders: Filter order per design, or one order for all designs
+        alphas: alpha1 per design for Lp/Hp, (alpha1, alpha2) rows for Bp/Bs;
+            a single value (or pair) applies to all designs
+        chebrip: Chebyshev ripple in dB (must be negative)
+        use_blt: Use bilinear transform (True) or matched-z (False)
+        prewarp: Pre-warp frequencies for bilinear transform
+
+    Returns:
+        List of designed MkFilter objects, in input order
+    """
+    alphas = np.asarray(alphas, dtype=float)
+    alphas = alphas.reshape(-1, 2) if band_type in ('Bp', 'Bs') else alphas.reshape(-1, 1)
+    orders, alpha1, alpha2 = np.broadcast_arrays(np.asarray(orders, dtype=int),
+                                                 alphas[:, 0], alphas[:, -1])
+    polyval = np.polynomial.polynomial.polyval
+
+    filters = [None] * len(orders)
+    for order in np.unique(orders):
+        idx = np.flatnonzero(orders == order)
+
+        # Run the pipeline stages on a batch instance with (m, 1) alphas
+        batch = MkFilter()
+        batch.filter_type = filter_type
+        batch.band_type = band_type
+        batch.order = int(order)
+        batch.chebrip = chebrip
+        batch.use_blt = use_blt
+        batch.prewarp = prewarp
+        batch.raw_alpha1 = alpha1[idx, None]
+        batch.raw_alpha2 = alpha2[idx, None]
+        batch._compute_s_plane()
+        batch._prewarp_frequencies()
+        batch._normalize()
+        if use_blt:
+            batch._compute_z_blt()
         else:
-            print()
+            batch._compute_z_mzt()
+        warped1 = np.broadcast_to(batch.warped_alpha1, (len(idx), 1))
+        warped2 = np.broadcast_to(batch.warped_alpha2, (len(idx), 1))
+
+        # Expand each design; DC and HF gains are evaluated for the whole
+        # group at once. The centre-frequency gain stays per design: the
+        # complex Horner recurrence is ill-conditioned for narrow high-order
+        # bands, and array arithmetic rounds differently from design()'s.
+        top = np.array([batch._expand(z) for z in batch.z_zeros])
+        bot = np.array([batch._expand(p) for p in batch.z_poles])
+        theta = TWOPI * 0.5 * (alpha1[idx] + alpha2[idx])
+        dc_gain = polyval(1.0, top.T) / polyval(1.0, bot.T)
+        fc_gain = [batch._evaluate(t, b, np.exp(1j * th))
+                   for t, b, th in zip(top, bot, theta)]
+        hf_gain = polyval(-1.0, top.T) / polyval(-1.0, bot.T)
+        xcoeffs = np.real(top) / np.real(bot[:, -1:])
+        ycoeffs = -np.real(bot) / np.real(bot[:, -1:])
+
+        for row, i in enumerate(idx):
+            values = {
+                'filter_type': filter_type, 'band_type': band_type,
+                'order': int(order), 'raw_alpha1': float(alpha1[i]),
+                'raw_alpha2': float(alpha2[i]), 'chebrip': chebrip,
+                'use_blt': use_blt, 'prewarp': prewarp,
+                'warped_alpha1': float(warped1[row, 0]),
+                'warped_alpha2': float(warped2[row, 0]),
+                's_poles': batch.s_poles[row].copy(), 's_zeros': batch.s_zeros[row].copy(),
+                'z_poles': batch.z_poles[row].copy(), 'z_zeros': batch.z_zeros[row].copy(),
+                'xcoeffs': xcoeffs[row].copy(), 'ycoeffs': ycoeffs[row].copy(),
+                'dc_gain': dc_gain[row], 'fc_gain': fc_gain[row], 'hf_gain': hf_gain[row],
+            }
+            mkf = MkFilter()
+            for name in _DESIGN_STATE:
+                setattr(mkf, name, values[name])
+            filters[i] = mkf
+
+    return filters
+
+
+def _iir_df2t(b: np.ndarray, a: np.ndarray, signal: np.ndarray,
+              out: np.ndarray):
+    """Run a direct-form II transposed IIR filter (a[0] == 1) over signal"""
+    nstate = len(b) - 1
+    w = np.zeros(max(nstate, 1))
+    for n in range(len(signal)):
+        x = signal[n]
+        y = b[0] * x + w[0]
+        for k in range(nstate - 1):
+            w[k] = b[k+1] * x - a[k+1] * y + w[k+1]
+        if nstate > 0:
+            w[nstate-1] = b[nstate] * x - a[nstate] * y
+        out[n] = y
+
+
+# Kernel used by iir_apply; resolved on first use so that importing the
+# module (and every CLI call) does not pay for loading Numba
+_IIR_KERNEL = None
+
+
+def _iir_kernel():
+    """Return _iir_df2t, JIT-compiled with Numba when it is installed"""
+    global _IIR_KERNEL
+    if _IIR_KERNEL is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _IIR_KERNEL = _iir_df2t
+        else:
+            _IIR_KERNEL = njit(cache=True, fastmath=True)(_iir_df2t)
+    return _IIR_KERNEL
 
-        print("\nS-plane zeros:")
-        for z in self.splane.zeros:
-            print(f"\t{z.real:14.10f} + j {z.imag:14.10f}")
 
-        print("\nS-plane poles:")
-        for p in self.splane.poles:
-            print(f"\t{p.real:14.10f} + j {p.imag:14.10f}")
+def iir_apply(xcoeffs: np.ndarray, ycoeffs: np.ndarray, signal: np.ndarray,
+              gain: float) -> np.ndarray:
+    """
+    Apply a designed filter's recurrence relation to a signal
 
-        print("\nZ-plane zeros:")
-        for z in self.zplane.zeros:
-            print(f"\t{z.real:14.10f} + j {z.imag:14.10f}")
+    Uses a direct-form II transposed kernel (max(nzeros, npoles) state
+    values, no buffer shifting), compiled with Numba when it is installed.
 
-        print("\nZ-plane poles:")
-        for p in self.zplane.poles:
-            print(f"\t{p.real:14.10f} + j {p.imag:14.10f}")
+    Args:
+        xcoeffs: X coefficients from MkFilter.design()
+        ycoeffs: Y coefficients from MkFilter.design()
+        signal: Input samples
+        gain: Filter gain (MkFilter.get_gain()); input is divided by it
+
+    Returns:
+        Filtered signal
+    """
+    # Recurrence in z^-1 form: b[k] multiplies x[n-k], a[k] multiplies y[n-k]
+    order = max(len(xcoeffs), len(ycoeffs))
+    b = np.zeros(order)
+    a = np.zeros(order)
+    b[:len(xcoeffs)] = xcoeffs[::-1] / gain
+    a[:len(ycoeffs)] = -ycoeffs[::-1]
+
+    signal = np.ascontiguousarray(signal, dtype=np.float64)
+    out = np.empty(len(signal))
+    _iir_kernel()(b, a, signal, out)
+    return out
 
-        print("\nRecurrence relation:")
-        print("y[n] = ", end="")
-        for i, c in enumerate(self.xcoeffs):
-            if i > 0:
-                print("     + ", end="")
-            print(f"({c:14.10f} * x[n-{len(self.xcoeffs)-1-i:2d}])")
-        print()
-        for i, c in enumerate(self.ycoeffs[:-1]):  # Don't print last (always -1)
-            print(f"     + ({c:14.10f} * y[n-{len(self.ycoeffs)-1-i:2d}])")
-        print()
 
+def _coeff_rows(coeffs: np.ndarray) -> List[str]:
+    """Format coefficients as C initializer lines, four per line"""
+    cells = np.char.mod(" %+0.10f,", np.asarray(coeffs, dtype=float)).tolist()
+    rows = ["".join(cells[i:i + 4]) for i in range(0, len(cells), 4)] or [""]
+    return ["  " + rows[0]] + ["   " + row for row in rows[1:]]
 
-def generate_c_code(mkf: MkFilter, optimize: bool = True) -> str:
+
+def generate_c_code(mkf: MkFilter, optimize: bool = True,
+                    transposed: bool = False, sos: bool = False) -> str:
     """
     Generate C code to implement the filter
 
     Args:
         mkf: MkFilter object with designed filter
         optimize: Generate optimized code (True) or simple loop (False)
+        transposed: Generate a vectorizable direct form II transposed
+            kernel (takes precedence over optimize)
+        sos: Generate a cascade of second-order sections (biquads), which
+            stays accurate at high orders (takes precedence over the others)
 
     Returns:
         C code as string
@@ -412,67 +767,127 @@ def generate_c_code(mkf: MkFilter, optimize: bool = True) -> str:
     code.append(f"#define NPOLES {npoles}")
     code.append(f"#define GAIN   {gain:15.9e}\n")
 
-    code.append("static float xv[NZEROS+1], yv[NPOLES+1];\n")
+    if sos:
+        # Cascade of biquads, each in direct form II transposed. GAIN is
+        # applied to the input, so the section coefficients stay O(1).
+        sections = mkf.to_sos()
+        sections[0, :3] *= gain
+        code.append(f"#define NSEC   {len(sections)}\n")
+
+        code.append("static const float sos[NSEC][6] = {")
+        for row in sections + 0.0:  # + 0.0 turns -0.0 into 0.0
+            code.append("  {" + ",".join(np.char.mod(" %+0.10f", row).tolist()) + " },")
+        code.append("};\n")
+        code.append("static float state[NSEC][2];\n")
+
+        code.append("static float filterStep(float input)")
+        code.append("{")
+        code.append("  int s;")
+        code.append("  float x = input / GAIN;")
+        code.append("  for (s = 0; s < NSEC; s++)")
+        code.append("  {")
+        code.append("    const float *c = sos[s];")
+        code.append("    float y = c[0] * x + state[s][0];")
+        code.append("    state[s][0] = c[1] * x - c[4] * y + state[s][1];")
+        code.append("    state[s][1] = c[2] * x - c[5] * y;")
+        code.append("    x = y;")
+        code.append("  }")
+        code.append("  return x;")
+        code.append("}\n")
+    elif transposed:
+        # Direct form II transposed: one state vector of max(NZEROS, NPOLES)
+        # taps, updated by a single loop with no loop-carried dependency, so
+        # the compiler can turn it into packed multiply-adds.
+        nstate = max(nzeros, npoles)
+        b = np.zeros(nstate + 1)
+        a = np.zeros(nstate + 1)
+        b[:nzeros + 1] = mkf.xcoeffs[::-1]
+        a[:npoles + 1] = -mkf.ycoeffs[::-1]
+
+        code.append(f"#define NSTATE {nstate}\n")
+        code.append("#if defined(__GNUC__)")
+        code.append("#define ALIGN32 __attribute__((aligned(32)))")
+        code.append("#else")
+        code.append("#define ALIGN32")
+        code.append("#endif\n")
+        code.append("#if defined(__clang__)")
+        code.append("#define VECTORIZE _Pragma(\"clang loop vectorize(enable)\")")
+        code.append("#elif defined(__GNUC__)")
+        code.append("#define VECTORIZE _Pragma(\"GCC ivdep\")")
+        code.append("#else")
+        code.append("#define VECTORIZE")
+        code.append("#endif\n")
+
+        code.append("static const float bcoeffs[NSTATE+1] ALIGN32 = {")
+        code.extend(_coeff_rows(b))
+        code.append("};\n")
+        code.append("static const float acoeffs[NSTATE+1] ALIGN32 = {")
+        code.extend(_coeff_rows(a))
+        code.append("};\n")
+        code.append("static float w[NSTATE] ALIGN32;\n")
 
-    if optimize:
         code.append("static float filterStep(float input)")
         code.append("{")
+        code.append("  int k;")
+        code.append("  float in = input / GAIN;")
+        code.append("  float out = bcoeffs[0] * in + w[0];")
+        code.append("  VECTORIZE")
+        code.append("  for (k = 0; k < NSTATE-1; k++)")
+        code.append("    w[k] = bcoeffs[k+1] * in - acoeffs[k+1] * out + w[k+1];")
+        code.append("  w[NSTATE-1] = bcoeffs[NSTATE] * in - acoeffs[NSTATE] * out;")
+        code.append("  return out;")
+        code.append("}\n")
+    elif optimize:
+        # Circular buffers: instead of shifting every tap each sample, advance
+        # a position index. Sizes are rounded up to a power of two so the
+        # wrap-around is a single AND with a compile-time mask.
+        xsize = 1 << nzeros.bit_length()
+        ysize = 1 << npoles.bit_length()
+        code.append(f"#define XMASK  {xsize - 1}   /* NZEROS+1 rounded up to a power of two, minus 1 */")
+        code.append(f"#define YMASK  {ysize - 1}   /* NPOLES+1 rounded up to a power of two, minus 1 */\n")
+
+        code.append("static float xv[XMASK+1], yv[YMASK+1];")
+        code.append("static unsigned int xpos, ypos;\n")
 
-        # Shift x values
-        for i in range(nzeros):
-            code.append(f"  xv[{i}] = xv[{i+1}];")
-        code.append(f"  xv[{nzeros}] = input / GAIN;")
+        code.append("static float filterStep(float input)")
+        code.append("{")
+        code.append("  xpos = (xpos + 1) & XMASK;")
+        code.append("  ypos = (ypos + 1) & YMASK;")
+        code.append("  xv[xpos] = input / GAIN;")
         code.append("")
 
-        # Shift y values
-        for i in range(npoles):
-            code.append(f"  yv[{i}] = yv[{i+1}];")
-
-        # Compute output
+        # Compute output: x[n-k] lives at xv[(xpos - k) & XMASK],
+        # y[n-k] at yv[(ypos - k) & YMASK]
         # X coefficients
         terms = []
         for i, c in enumerate(mkf.xcoeffs):
             if abs(c) > EPS:
-                terms.append(f"({c:14.10f} * xv[{i}])")
+                k = nzeros - i
+                index = "xpos" if k == 0 else f"(xpos - {k}) & XMASK"
+                terms.append(f"({c:14.10f} * xv[{index}])")
 
         # Y coefficients (skip last which is always -1)
         for i, c in enumerate(mkf.ycoeffs[:-1]):
             if abs(c) > EPS:
-                terms.append(f"({c:14.10f} * yv[{i}])")
+                terms.append(f"({c:14.10f} * yv[(ypos - {npoles - i}) & YMASK])")
 
-        code.append(f"  yv[{npoles}] = " + terms[0])
+        code.append("  yv[ypos] = " + terms[0])
         for term in terms[1:]:
             code.append("           + " + term)
         code[-1] = code[-1] + ";"
 
-        code.append(f"  return yv[{npoles}];")
+        code.append("  return yv[ypos];")
         code.append("}\n")
     else:
-        # Generate simple loop version with coefficient arrays
-        xcoeff_lines = []
-        current_line = "  "
-        for i, c in enumerate(mkf.xcoeffs):
-            if i > 0 and i % 4 == 0:
-                xcoeff_lines.append(current_line)
-                current_line = "   "
-            current_line += f" {c:+0.10f},"
-        xcoeff_lines.append(current_line)
+        code.append("static float xv[NZEROS+1], yv[NPOLES+1];\n")
 
+        # Generate simple loop version with coefficient arrays
         code.append("static float xcoeffs[] = {")
-        code.extend(xcoeff_lines)
+        code.extend(_coeff_rows(mkf.xcoeffs))
         code.append("};\n")
 
-        ycoeff_lines = []
-        current_line = "  "
-        for i, c in enumerate(mkf.ycoeffs[:-1]):
-            if i > 0 and i % 4 == 0:
-                ycoeff_lines.append(current_line)
-                current_line = "   "
-            current_line += f" {c:+0.10f},"
-        ycoeff_lines.append(current_line)
-
         code.append("static float ycoeffs[] = {")
-        code.extend(ycoeff_lines)
+        code.extend(_coeff_rows(mkf.ycoeffs[:-1]))
         code.append("};\n")
 
         code.append("static float filterStep(float input)")
@@ -561,6 +976,10 @@ Examples:
                        help='Generate C code')
     parser.add_argument('--code-simple', action='store_true',
                        help='Generate simple C code with loops')
+    parser.add_argument('--code-df2t', action='store_true',
+                       help='Generate vectorizable direct form II transposed C code')
+    parser.add_argument('--code-sos', action='store_true',
+                       help='Generate C code as a cascade of second-order sections')
 
     args = parser.parse_args()
 
@@ -637,16 +1056,16 @@ Examples:
         if args.list_only:
             # Compact output format (like mkfilter -l)
             gain = mkf.get_gain()
-            print(f"G  = {gain:.10e}")
-            print(f"NZ = {len(mkf.xcoeffs)-1}")
-            for c in mkf.xcoeffs:
-                print(f"{c:18.10e}")
-            print(f"NP = {len(mkf.ycoeffs)-1}")
-            for c in mkf.ycoeffs:
-                print(f"{c:18.10e}")
-        elif args.code or args.code_simple:
+            buf = io.StringIO()
+            buf.write(f"G  = {gain:.10e}\nNZ = {len(mkf.xcoeffs)-1}\n")
+            np.savetxt(buf, mkf.xcoeffs, fmt="%18.10e")
+            buf.write(f"NP = {len(mkf.ycoeffs)-1}\n")
+            np.savetxt(buf, mkf.ycoeffs, fmt="%18.10e")
+            sys.stdout.write(buf.getvalue())
+        elif args.code or args.code_simple or args.code_df2t or args.code_sos:
             # Generate C code
-            code = generate_c_code(mkf, optimize=not args.code_simple)
+            code = generate_c_code(mkf, optimize=not args.code_simple,
+                                   transposed=args.code_df2t, sos=args.code_sos)
             print(code)
         else:
             # Full summary
@@ -4,8 +4,9 @@ Teste simples do mkfilter.py
 Demonstra o uso básico sem dependências pesadas
 """
 
+import shutil
 import sys
-from mkfilter import MkFilter, generate_c_code
+from mkfilter import MkFilter, _design_cached, design_batch, generate_c_code, iir_apply
 
 
 def test_butterworth_lowpass():
@@ -30,9 +31,19 @@ def test_butterworth_lowpass():
     print(f"  Nº coeficientes X: {len(xcoeffs)}")
     print(f"  Nº coeficientes Y: {len(ycoeffs)}")
 
-    # Verificar que os polos estão dentro do círculo unitário
+    # Repetir o projeto (com alpha como array NumPy) deve vir do cache
     import numpy as np
-    poles_magnitude = np.abs(mkf.zplane.poles)
+    hits = _design_cached.cache_info().hits
+    repeat = MkFilter()
+    xrep, yrep = repeat.design('Bu', 'Lp', np.int64(4), np.array(0.1))
+    assert _design_cached.cache_info().hits == hits + 1, "design() nao usou o cache"
+    assert np.array_equal(xrep, xcoeffs) and np.array_equal(yrep, ycoeffs), \
+        "design() repetido difere do original"
+    assert xrep is not xcoeffs and xrep.flags.writeable, "cache devolveu o array interno"
+    print(f"[OK] Projeto repetido servido pelo cache")
+
+    # Verificar que os polos estão dentro do círculo unitário
+    poles_magnitude = np.abs(mkf.z_poles)
     all_stable = np.all(poles_magnitude < 1.0)
 
     if all_stable:
@@ -86,6 +97,13 @@ def test_bandpass():
     print(f"  Banda: 0.1 a 0.3")
     print(f"  Ganho: {mkf.get_gain():.6f}")
 
+    # Projeto em lote deve reproduzir design()
+    import numpy as np
+    batch = design_batch('Bu', 'Bp', [4, 2], [[0.1, 0.3], [0.2, 0.25]])
+    assert np.array_equal(batch[0].xcoeffs, xcoeffs), "design_batch difere de design()"
+    assert np.array_equal(batch[0].ycoeffs, ycoeffs), "design_batch difere de design()"
+    print(f"[OK] design_batch confere com design() ({len(batch)} filtros)")
+
     return mkf
 
 
@@ -126,15 +144,34 @@ def test_code_generation(mkf):
         ("#define NZEROS", "Definicao NZEROS"),
         ("#define NPOLES", "Definicao NPOLES"),
         ("#define GAIN", "Definicao GAIN"),
-        ("xv[NZEROS+1]", "Buffer xv"),
-        ("yv[NPOLES+1]", "Buffer yv"),
+        ("xv[XMASK+1]", "Buffer circular xv"),
+        ("yv[YMASK+1]", "Buffer circular yv"),
+        ("& XMASK", "Indice circular xv"),
         ("filterStep", "Funcao filterStep"),
         ("return yv", "Return statement"),
     ]
 
+    # Versão transposta (DF2T) vetorizável
+    df2t_code = generate_c_code(mkf, transposed=True)
+    df2t_checks = [
+        ("#define NSTATE", "DF2T: Definicao NSTATE"),
+        ("w[NSTATE]", "DF2T: Vetor de estado w"),
+        ("VECTORIZE", "DF2T: Laco vetorizavel"),
+    ]
+
+    # Cascata de seções de segunda ordem (biquads)
+    sos_code = generate_c_code(mkf, sos=True)
+    sos_checks = [
+        ("#define NSEC", "SOS: Definicao NSEC"),
+        ("sos[NSEC][6]", "SOS: Coeficientes das secoes"),
+        ("state[NSEC][2]", "SOS: Estado das secoes"),
+    ]
+
     all_ok = True
-    for check_str, description in checks:
-        if check_str in c_code:
+    for check_str, description, code in ([(s, d, c_code) for s, d in checks] +
+                                         [(s, d, df2t_code) for s, d in df2t_checks] +
+                                         [(s, d, sos_code) for s, d in sos_checks]):
+        if check_str in code:
             print(f"  [OK] {description}")
         else:
             print(f"  [FAIL] {description} - NAO ENCONTRADO")
@@ -187,6 +224,59 @@ def test_filter_application():
             yv[-1] = np.dot(xcoeffs, xv) + np.dot(ycoeffs[:-1], yv[:-1])
             output[n] = yv[-1]
 
+        # Comparar com o núcleo forma direta II transposta
+        kernel_output = iir_apply(xcoeffs, ycoeffs, signal, gain)
+        if not np.allclose(kernel_output, output, rtol=1e-9, atol=1e-12):
+            print(f"[FAIL] iir_apply difere da recorrencia direta")
+            return False
+        print(f"[OK] iir_apply confere com a recorrencia direta")
+
+        # Cascata de seções de segunda ordem (requer SciPy)
+        try:
+            from scipy.signal import sosfilt
+            sos_output = sosfilt(mkf.to_sos(), signal)
+            if not np.allclose(sos_output, output, rtol=1e-9, atol=1e-12):
+                print(f"[FAIL] to_sos difere da recorrencia direta")
+                return False
+            print(f"[OK] to_sos confere com a recorrencia direta")
+        except ImportError:
+            print(f"[SKIP] SciPy nao disponivel - to_sos ignorado")
+
+        # apply() sem núcleo nativo: lfilter (se houver SciPy) e iir_apply,
+        # com várias linhas filtradas de forma independente
+        signals = np.stack([signal, np.roll(signal, 5), -signal])
+        expected = np.stack([iir_apply(xcoeffs, ycoeffs, row, gain) for row in signals])
+        mkf._native = None
+        lfilter_output = mkf.apply(signals)
+        saved = sys.modules.get('scipy.signal')
+        sys.modules['scipy.signal'] = None  # simula SciPy ausente
+        try:
+            fallback_output = mkf.apply(signals)
+        finally:
+            if saved is None:
+                del sys.modules['scipy.signal']
+            else:
+                sys.modules['scipy.signal'] = saved
+        for name, result in [("lfilter", lfilter_output), ("iir_apply", fallback_output)]:
+            if result.shape != signals.shape or not np.allclose(result, expected, rtol=1e-9, atol=1e-12):
+                print(f"[FAIL] apply() via {name} difere por linha")
+                return False
+        print(f"[OK] apply() via lfilter e iir_apply conferem (entrada 2-D)")
+
+        # Núcleo nativo compilado (requer compilador C)
+        if shutil.which("cc"):
+            mkf.compile_native()
+            native_output = mkf.apply(signal)
+            if not np.allclose(native_output, output, rtol=1e-4, atol=1e-6):
+                print(f"[FAIL] compile_native difere da recorrencia direta")
+                return False
+            if not np.allclose(mkf.apply(signals), expected, rtol=1e-4, atol=1e-6):
+                print(f"[FAIL] compile_native difere por linha (entrada 2-D)")
+                return False
+            print(f"[OK] compile_native confere com a recorrencia direta")
+        else:
+            print(f"[SKIP] Compilador C nao disponivel - compile_native ignorado")
+
         # Verificar que o filtro produziu saída
         max_output = np.max(np.abs(output))
         energy = np.sum(output**2)